@@ -6,6 +6,47 @@
 from spack.error import SpackError
 from spack.package import *
 
+# CMake options that map directly onto a variant of the same meaning
+_VARIANT_MAP = (
+    ('OCTOTIGER_WITH_CUDA', 'cuda'),
+    ('OCTOTIGER_WITH_KOKKOS', 'kokkos'),
+    ('OCTOTIGER_WITH_HIP', 'rocm'),
+    ('OCTOTIGER_WITH_MONOPOLE_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'),
+    ('OCTOTIGER_WITH_MULTIPOLE_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'),
+    ('OCTOTIGER_WITH_HYDRO_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'),
+    ('OCTOTIGER_WITH_KOKKOS_MULTIPOLE_TASKS', 'multipole_host_tasks'),
+    ('OCTOTIGER_WITH_KOKKOS_MONOPOLE_TASKS', 'monopole_host_tasks'),
+    ('OCTOTIGER_WITH_KOKKOS_HYDRO_TASKS', 'hydro_host_tasks'),
+    ('OCTOTIGER_WITH_FAST_FP_CONTRACT', 'fast_fp_contract'),
+    ('OCTOTIGER_WITH_BOOST_MULTIPRECISION', 'boost_multiprecision'),
+)
+
+# Patch minor issues depending on what version/variants we are using
+# Note that all patches/fixes have been upstreamed and are only required for the old versions
+_PATCHES = (
+    ("add_missing_headers_for_060.patch", "@0.6.0"),
+    ("add_missing_headers_for_070.patch", "@0.7.0"),
+    ("cast_workaround_for_070cuda.patch", "@0.7.0+cuda"),
+    ("fpic_workaround_for_070cuda.patch", "@0.7.0+cuda"),
+    ("add_missing_headers_for_080.patch", "@0.8.0"),
+    ("fix_sycl_for_0100.patch", "@0.10.0+sycl"),
+)
+
+# Pick HPX version and cxxstd depending on octotiger version:
+_HPX_DEPS = (
+    ('hpx@:1.4.1 cxxstd=14 ', '@:0.8.0'),
+    ('hpx@1.6:1.7 cxxstd=17 ', '@0.9.0'),
+    ('hpx@1.8.0: cxxstd=17 ', '@0.10.0:'),
+)
+
+# Pick Kokkos Version depending on Octotiger version:
+_KOKKOS_DEPS = (
+    ("kokkos@:3.6.01 ", "@0.9.0+kokkos"),
+    ("kokkos@3.6.01: ", "@0.10.0:+kokkos"),
+    ("kokkos@4.1.00: +hpx ", "+kokkos_hpx_kernels @0.10.0:"),
+    ("kokkos@:3.6.01 +hpx +hpx_async_dispatch ", "+kokkos_hpx_kernels @0.9.0"),
+)
+
 
 class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     """Octo-Tiger is an astrophysics program simulating the evolution of star
@@ -36,14 +77,8 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     version("0.6.0", sha256="14d97a0180a0e4b3b09e16526c7e22d0682335e3430ae0309f079875b15eefd2")
     
 
-    # Patch minor issues depending on what version/variants we are using
-    # Note that all patches/fixes have been upstreamed and are only required for the old versions
-    patch("add_missing_headers_for_060.patch", when="@0.6.0")
-    patch("add_missing_headers_for_070.patch", when="@0.7.0")
-    patch("cast_workaround_for_070cuda.patch", when="@0.7.0+cuda")
-    patch("fpic_workaround_for_070cuda.patch", when="@0.7.0+cuda")
-    patch("add_missing_headers_for_080.patch", when="@0.8.0")
-    patch("fix_sycl_for_0100.patch", when="@0.10.0+sycl")
+    for patch_file, patch_when in _PATCHES:
+        patch(patch_file, when=patch_when)
 
 
     # All available variants:
@@ -104,10 +139,8 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     depends_on('cuda', when='+cuda')
     depends_on("dpcpp", when="+sycl")
 
-    # Pick HPX version and cxxstd depending on octotiger version:
-    depends_on('hpx@:1.4.1 cxxstd=14 ', when='@:0.8.0')
-    depends_on('hpx@1.6:1.7 cxxstd=17 ', when='@0.9.0')
-    depends_on('hpx@1.8.0: cxxstd=17 ', when='@0.10.0:')
+    for dep, dep_when in _HPX_DEPS:
+        depends_on(dep, when=dep_when)
     # Pick HPX GPU variants depending on octotiger's GPU variants:
     depends_on('hpx +cuda +async_cuda ', when='+cuda')
     depends_on('hpx +rocm ', when='+rocm')
@@ -128,13 +161,8 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     depends_on('cppuddle@0.2.1: +hpx', when='@0.10.0:')
     depends_on('cppuddle@0.1.0:0.2.1 ', when='@0.9.0')
 
-    # Pick Kokkos Version depending on Octotiger version:
-    depends_on("kokkos@:3.6.01 ", when="@0.9.0+kokkos")
-    depends_on("kokkos@3.6.01: ", when="@0.10.0:+kokkos")
-    depends_on("kokkos@4.1.00: +hpx ",
-                when="+kokkos_hpx_kernels @0.10.0:")
-    depends_on("kokkos@:3.6.01 +hpx +hpx_async_dispatch ",
-               when="+kokkos_hpx_kernels @0.9.0")
+    for dep, dep_when in _KOKKOS_DEPS:
+        depends_on(dep, when=dep_when)
     # Pick Kokkos execution spaces and GPU targets depending on the octotiger targets:
     kokkos_string = 'kokkos +serial +aggressive_vectorization '
     depends_on("kokkos +sycl ", when="+sycl+kokkos")
@@ -143,21 +171,18 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     depends_on(kokkos_string + ' +wrapper ', when='+kokkos +cuda %gcc')
     for sm_ in CudaPackage.cuda_arch_values:
         # This loop propgates the chosem cuda_arch to kokkos.
-        depends_on(kokkos_string + ' +cuda +cuda_lambda cuda_arch={0}'.format(
-            sm_), when='+kokkos +cuda cuda_arch={0}'.format(sm_))
-        depends_on('hpx-kokkos +cuda cuda_arch={0}'.format(sm_),
-                when='+kokkos +cuda cuda_arch={0}'.format(sm_))
-        depends_on('hpx +cuda cuda_arch={0}'.format(sm_),
-                when='+cuda cuda_arch={0}'.format(sm_))
+        when_cuda_arch = f"+kokkos +cuda cuda_arch={sm_}"
+        depends_on(f"{kokkos_string} +cuda +cuda_lambda cuda_arch={sm_}", when=when_cuda_arch)
+        depends_on(f"hpx-kokkos +cuda cuda_arch={sm_}", when=when_cuda_arch)
+        depends_on(f"hpx +cuda cuda_arch={sm_}", when=f"+cuda cuda_arch={sm_}")
     for gfx in ROCmPackage.amdgpu_targets:
         # This loop propgates the chosem amdgpu_target to hpx, kokkos and hpx-kokkos.
-        depends_on(kokkos_string + ' +rocm amdgpu_target={0}'.format(gfx),
-                   when='+kokkos +rocm amdgpu_target={0}'.format(gfx))
-        depends_on('hpx +rocm amdgpu_target={0}'.format(gfx),
+        when_amdgpu_target = f"+kokkos +rocm amdgpu_target={gfx}"
+        depends_on(f"{kokkos_string} +rocm amdgpu_target={gfx}", when=when_amdgpu_target)
+        depends_on(f"hpx +rocm amdgpu_target={gfx}",
                    patches=['hpx_rocblas.patch'],
-                   when='+rocm amdgpu_target={0}'.format(gfx))
-        depends_on('hpx-kokkos@master +rocm amdgpu_target={0}'.format(gfx),
-                   when='+kokkos +rocm amdgpu_target={0}'.format(gfx))
+                   when=f"+rocm amdgpu_target={gfx}")
+        depends_on(f"hpx-kokkos@master +rocm amdgpu_target={gfx}", when=when_amdgpu_target)
 
 
     # Known conflicts
@@ -184,29 +209,37 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
     build_directory = "spack-build"
 
     def cmake_args(self):
-        spec, args = self.spec, []
+        spec = self.spec
+        args = [self.define_from_variant(cmake_var, variant)
+                for cmake_var, variant in _VARIANT_MAP]
+        # Evaluate the frequently queried spec constraints only once
+        is_090 = spec.satisfies("@0.9.0")
+        is_0100 = spec.satisfies("@0.10.0:")
+        has_cuda = "+cuda" in spec
+        has_rocm = "+rocm" in spec
+        has_sycl = "+sycl" in spec
+        # Only defined with +kokkos, so "~" is not the negation of "+" here
+        no_kokkos_hpx = "~kokkos_hpx_kernels" in spec
+        variants = spec.variants
 
-        # CUDA & Kokkos config
-        args.append(self.define_from_variant('OCTOTIGER_WITH_CUDA', 'cuda'))
-        args.append(self.define_from_variant('OCTOTIGER_WITH_KOKKOS', 'kokkos'))
-        if '+cuda' in spec:
-            cuda_arch_list = spec.variants['cuda_arch'].value
+        # CUDA config
+        if has_cuda:
+            cuda_arch_list = variants['cuda_arch'].value
             cuda_arch = cuda_arch_list[0]
             if cuda_arch != 'none':
                 args.append('-DOCTOTIGER_CUDA_ARCH=sm_{0}'.format(cuda_arch))
                 args.append('-DCMAKE_CUDA_ARCHITECTURES={0}'.format(cuda_arch))
 
         # HIP config
-        args.append(self.define_from_variant('OCTOTIGER_WITH_HIP', 'rocm'))
-        if "+rocm" in self.spec:
-            args += [self.define("CMAKE_CXX_COMPILER", self.spec["hip"].hipcc)]
+        if has_rocm:
+            args += [self.define("CMAKE_CXX_COMPILER", spec["hip"].hipcc)]
         # SYCL config
-        if "+sycl ^dpcpp" in self.spec:
+        if has_sycl and "^dpcpp" in spec:
             args += [self.define("CMAKE_CXX_COMPILER",
                                  "{0}/bin/clang++".format(spec["dpcpp"].prefix))]
 
         # SIMD & CPU kernel config
-        if spec.satisfies("@0.9.0"):
+        if is_090:
             if spec.satisfies("simd_extension=DISCOVER"):
                 args.append('-DOCTOTIGER_WITH_FORCE_SCALAR_KOKKOS_SIMD=OFF')
             elif spec.satisfies("simd_extension=SCALAR"):
@@ -219,26 +252,10 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
                 'OCTOTIGER_KOKKOS_SIMD_LIBRARY', 'simd_library'))
             args.append(self.define_from_variant(
                 'OCTOTIGER_KOKKOS_SIMD_EXTENSION', 'simd_extension'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_MONOPOLE_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_MULTIPOLE_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_HYDRO_HOST_HPX_EXECUTOR', 'kokkos_hpx_kernels'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_KOKKOS_MULTIPOLE_TASKS', 'multipole_host_tasks'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_KOKKOS_MONOPOLE_TASKS', 'monopole_host_tasks'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_KOKKOS_HYDRO_TASKS', 'hydro_host_tasks'))
-        if (("~kokkos_hpx_kernels" in spec or "-kokkos_hpx_kernels" in spec) and
-            spec.satisfies("@0.10.0:")):
-            if int(spec.variants["multipole_host_tasks"].value) > 1:
-                raise SpackError("multipole_host_tasks > 1 requires +kokkos_hpx_kernels")
-            if int(spec.variants["monopole_host_tasks"].value) > 1:
-                raise SpackError("monopole_host_tasks > 1 requires +kokkos_hpx_kernels")
-            if int(spec.variants["hydro_host_tasks"].value) > 1:
-                raise SpackError("hydro_host_tasks > 1 requires +kokkos_hpx_kernels")
+        if no_kokkos_hpx and is_0100:
+            for name in ("multipole_host_tasks", "monopole_host_tasks", "hydro_host_tasks"):
+                if int(variants[name].value) > 1:
+                    raise SpackError("{0} > 1 requires +kokkos_hpx_kernels".format(name))
         args.append(self.define('OCTOTIGER_WITH_VC', 'ON'))
         args.append(self.define('OCTOTIGER_WITH_LEGACY_VC', 'OFF'))
         # Required for SVE SIMD on A64Fx
@@ -252,18 +269,19 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
                                    or spec.satisfies("griddim=16")):
             raise SpackError("Octo-Tiger tests only work with griddim=8 and griddim=16. "
                              "Disable tests or change griddim!")
-        if not self.run_tests or (spec.satisfies("%arm") or spec.satisfies("%clang") or spec.target == "neoverse_v2" or
-           spec.satisfies("+rocm") or spec.satisfies("+sycl") or spec.target == "a64fx"):
+        # Cheap target/variant checks first, compiler checks last
+        if not self.run_tests or (spec.target in ("a64fx", "neoverse_v2") or has_rocm or has_sycl or
+                                  spec.satisfies("%clang") or spec.satisfies("%arm")):
             args.append(self.define('OCTOTIGER_WITH_BLAST_TEST', 'OFF'))
         else:
             args.append(self.define('OCTOTIGER_WITH_BLAST_TEST', 'ON'))
 
         # Compute config
-        args.append(self.define_from_variant('OCTOTIGER_WITH_FAST_FP_CONTRACT', 'fast_fp_contract'))
-        args.append('-DOCTOTIGER_WITH_GRIDDIM={0}'.format(spec.variants['griddim'].value))
-        args.append('-DOCTOTIGER_THETA_MINIMUM={0}'.format(spec.variants['theta_minimum'].value))
+        griddim = variants['griddim'].value
+        args.append('-DOCTOTIGER_WITH_GRIDDIM={0}'.format(griddim))
+        args.append('-DOCTOTIGER_THETA_MINIMUM={0}'.format(variants['theta_minimum'].value))
         args.append(self.define('OCTOTIGER_WITH_MAX_NUMBER_FIELDS', '15'))
-        if int(spec.variants["griddim"].value) > 20:
+        if int(griddim) > 20:
             args.append('-DOCTOTIGER_DISABLE_ILIST=ON')
         else:
             args.append('-DOCTOTIGER_DISABLE_ILIST=OFF')
@@ -272,8 +290,7 @@ class Octotiger(CMakePackage, CudaPackage, ROCmPackage):
         # Misc
         args.append(self.define('OCTOTIGER_WITH_UNBUFFERED_STDOUT', 'OFF'))
         args.append(self.define('CMAKE_EXPORT_COMPILE_COMMANDS', 'ON'))
-        args.append(self.define_from_variant(
-            'OCTOTIGER_WITH_BOOST_MULTIPRECISION', 'boost_multiprecision'))
+        # Kept after the a64fx OCTOTIGER_WITH_CXX20 define above, as CMake uses the last one
         args.append(self.define_from_variant(
             'OCTOTIGER_WITH_CXX20', 'cxx20'))
 